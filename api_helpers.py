@@ -0,0 +1,93 @@
+"""
+Helpers shared by the API servers.
+PDF extraction runs in worker processes, since PDFium is not thread-safe,
+so these functions live at module level where they can be pickled.
+"""
+import asyncio
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+from typing import List, Optional
+
+import pypdfium2 as pdfium
+
+# Pages extracted by one worker call
+PDF_PAGES_PER_WORKER = 16
+
+# One pool per server process, created by start_pdf_pool on startup
+pdf_pool: Optional[ProcessPoolExecutor] = None
+
+
+def start_pdf_pool():
+    global pdf_pool
+    if pdf_pool is None:
+        # Spawned workers start from a fresh interpreter rather than forking a
+        # process whose gRPC clients already have threads and open channels
+        pdf_pool = ProcessPoolExecutor(
+            max_workers=os.cpu_count(), mp_context=multiprocessing.get_context("spawn")
+        )
+
+
+def shutdown_pdf_pool():
+    global pdf_pool
+    if pdf_pool is not None:
+        pdf_pool.shutdown(wait=False, cancel_futures=True)
+        pdf_pool = None
+
+
+def count_pdf_pages(file_path: str) -> int:
+    pdf = pdfium.PdfDocument(file_path)
+    try:
+        return len(pdf)
+    finally:
+        pdf.close()
+
+
+def extract_page_range(file_path: str, start: int, stop: int) -> List[str]:
+    """Extract text from pages [start, stop) of a PDF, skipping empty pages.
+    A page that cannot be read becomes a placeholder instead of failing the document."""
+    parts = []
+    pdf = pdfium.PdfDocument(file_path)
+    try:
+        for i in range(start, stop):
+            page = pdf[i]
+            try:
+                textpage = page.get_textpage()
+                extracted = textpage.get_text_bounded()
+                textpage.close()
+                if extracted.strip():
+                    # Drop anything that cannot be encoded, such as lone surrogates
+                    parts.append(extracted.encode('utf-8', errors='ignore').decode('utf-8'))
+            except Exception:
+                parts.append(f"\n[Error reading page {i + 1}: Unable to extract text]\n")
+            finally:
+                page.close()
+    finally:
+        pdf.close()
+    return parts
+
+
+async def extract_pdf_pages(file_path: str) -> List[str]:
+    """Extract the text of every non-empty page, spread across the pool by page range"""
+    start_pdf_pool()
+    loop = asyncio.get_running_loop()
+    page_count = await loop.run_in_executor(pdf_pool, count_pdf_pages, file_path)
+    ranges = await asyncio.gather(*(
+        loop.run_in_executor(
+            pdf_pool, extract_page_range, file_path,
+            start, min(start + PDF_PAGES_PER_WORKER, page_count)
+        )
+        for start in range(0, page_count, PDF_PAGES_PER_WORKER)
+    ))
+    return [text for part in ranges for text in part]
+
+
+def start_llm_warm_up(llm) -> asyncio.Task:
+    """Send a tiny prompt in the background so the first question does not pay for connection setup"""
+    async def warm_up():
+        try:
+            await llm.ainvoke("ok")
+        except Exception as e:
+            print(f"LLM warm-up failed: {str(e)}")
+
+    return asyncio.create_task(warm_up())
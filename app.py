@@ -1,6 +1,5 @@
 import streamlit as st
-from PyPDF2 import PdfReader
-from langchain_community.document_loaders import PyPDFLoader
+import pypdfium2 as pdfium
 from langchain_text_splitters import RecursiveCharacterTextSplitter
 import os
 
@@ -23,35 +22,53 @@ genai.configure(api_key=api_key)
 # Also set it as environment variable for langchain_google_genai
 os.environ["GOOGLE_API_KEY"] = api_key
 
+def extract_pdf_pages(pdf_bytes):
+    pdf = pdfium.PdfDocument(pdf_bytes)
+    pages = []
+    try:
+        for page in pdf:
+            textpage = page.get_textpage()
+            pages.append(textpage.get_text_bounded())
+            textpage.close()
+            page.close()
+    finally:
+        pdf.close()
+    return pages
+
 def get_pdf_text(pdf_docs):
-    text = ""
+    pages = []
     if pdf_docs is not None:
         if isinstance(pdf_docs, list):
             for pdf in pdf_docs:
-                pdf_reader = PdfReader(pdf)
-                for page in pdf_reader.pages:
-                    text += page.extract_text() + "\n"
+                pages.extend(extract_pdf_pages(pdf.getvalue()))
         else:
             # Handle Streamlit file upload (UploadedFile object)
-            pdf_reader = PdfReader(pdf_docs)
-            for page in pdf_reader.pages:
-                text += page.extract_text() + "\n"
-    return text
+            pages.extend(extract_pdf_pages(pdf_docs.getvalue()))
+    return "\n".join(pages)
 
 def get_text_chunks(text):
-    text_splitter = RecursiveCharacterTextSplitter(chunk_size=10000, chunk_overlap=1000)
+    # Chunk by tokens so chunks fit the embedding model's input window
+    text_splitter = RecursiveCharacterTextSplitter.from_tiktoken_encoder(
+        encoding_name="cl100k_base", chunk_size=800, chunk_overlap=80
+    )
     return text_splitter.split_text(text)
 
-def get_vector_store(text_chunks):
-    embeddings = GoogleGenerativeAIEmbeddings(
+@st.cache_resource
+def get_embeddings():
+    # Shared across reruns and sessions so the client is only built once
+    return GoogleGenerativeAIEmbeddings(
         model="models/embedding-001",
         google_api_key=os.getenv("GOOGLE_API_KEY")
     )
+
+def get_vector_store(text_chunks):
+    embeddings = get_embeddings()
     vector_store = FAISS.from_texts(text_chunks, embedding=embeddings)
     vector_store.save_local("faiss_index")
     # Set session state to indicate processing is complete
     st.session_state.pdf_processed = True
    
+@st.cache_resource
 def get_conversation_chain():
     prompt_template="""
     You are a helpful assistant that answers questions about insurance policies based on the provided context.
@@ -96,10 +113,7 @@ def get_conversation_chain():
 
 def user_input(user_question):
     try:
-        embeddings = GoogleGenerativeAIEmbeddings(
-            model="models/embedding-001",
-            google_api_key=os.getenv("GOOGLE_API_KEY")
-        )
+        embeddings = get_embeddings()
         new_db = FAISS.load_local("faiss_index", embeddings, allow_dangerous_deserialization=True)
         docs = new_db.similarity_search(user_question)
         chain = get_conversation_chain()
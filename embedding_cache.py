@@ -0,0 +1,100 @@
+"""
+Content-addressed embedding cache.
+Vectors are stored in SQLite keyed by a hash of the model and text, so
+re-uploaded documents and repeated questions skip the embedding API.
+"""
+import asyncio
+import hashlib
+import sqlite3
+import threading
+from array import array
+from typing import Dict, List
+
+from langchain_core.embeddings import Embeddings
+
+# SQLite limits the number of bound parameters per statement
+LOOKUP_BATCH_SIZE = 500
+# Vectors kept before the oldest are evicted (about 3 KB each for 768 dimensions)
+MAX_ENTRIES = 100_000
+
+
+class CachedEmbeddings(Embeddings):
+    """Wrap an embeddings client and only call it for texts not seen before"""
+
+    def __init__(self, embeddings: Embeddings, namespace: str, db_path: str = ".embedcache.db",
+                 max_entries: int = MAX_ENTRIES):
+        self.embeddings = embeddings
+        self.namespace = namespace
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(db_path, check_same_thread=False)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS embeddings (key TEXT PRIMARY KEY, vector BLOB NOT NULL)"
+        )
+        self._conn.commit()
+
+    def _key(self, kind: str, text: str) -> str:
+        data = f"{self.namespace}\0{kind}\0{text}".encode("utf-8")
+        return hashlib.blake2b(data, digest_size=32).hexdigest()
+
+    def _lookup(self, keys: List[str]) -> Dict[str, List[float]]:
+        found = {}
+        with self._lock:
+            for start in range(0, len(keys), LOOKUP_BATCH_SIZE):
+                batch = keys[start:start + LOOKUP_BATCH_SIZE]
+                placeholders = ",".join("?" * len(batch))
+                rows = self._conn.execute(
+                    f"SELECT key, vector FROM embeddings WHERE key IN ({placeholders})", batch
+                )
+                for key, blob in rows:
+                    found[key] = array("f", blob).tolist()
+        return found
+
+    def _store(self, vectors: Dict[str, List[float]]):
+        # Vectors are kept as raw float32 bytes (4 bytes per dimension)
+        rows = [(key, array("f", vector).tobytes()) for key, vector in vectors.items()]
+        with self._lock:
+            self._conn.executemany("INSERT OR REPLACE INTO embeddings VALUES (?, ?)", rows)
+            # Every insert gets the next rowid, so this keeps the newest max_entries rows
+            self._conn.execute(
+                "DELETE FROM embeddings WHERE rowid <= (SELECT max(rowid) FROM embeddings) - ?",
+                (self.max_entries,)
+            )
+            self._conn.commit()
+
+    def _partition(self, kind: str, texts: List[str]):
+        keys = [self._key(kind, text) for text in texts]
+        cached = self._lookup(list(set(keys)))
+        # Deduplicate misses while keeping their original order
+        missing = dict.fromkeys(key for key in keys if key not in cached)
+        texts_by_key = dict(zip(keys, texts))
+        return keys, cached, {key: texts_by_key[key] for key in missing}
+
+    def _merge(self, keys, cached, missing_keys, vectors) -> List[List[float]]:
+        computed = dict(zip(missing_keys, vectors))
+        if computed:
+            self._store(computed)
+        cached.update(computed)
+        return [cached[key] for key in keys]
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        keys, cached, missing = self._partition("document", texts)
+        vectors = self.embeddings.embed_documents(list(missing.values())) if missing else []
+        return self._merge(keys, cached, list(missing), vectors)
+
+    def embed_query(self, text: str) -> List[float]:
+        keys, cached, missing = self._partition("query", [text])
+        vectors = [self.embeddings.embed_query(text)] if missing else []
+        return self._merge(keys, cached, list(missing), vectors)[0]
+
+    # SQLite reads and commits block, so the async variants run them in a thread
+
+    async def aembed_documents(self, texts: List[str]) -> List[List[float]]:
+        keys, cached, missing = await asyncio.to_thread(self._partition, "document", texts)
+        vectors = await self.embeddings.aembed_documents(list(missing.values())) if missing else []
+        return await asyncio.to_thread(self._merge, keys, cached, list(missing), vectors)
+
+    async def aembed_query(self, text: str) -> List[float]:
+        keys, cached, missing = await asyncio.to_thread(self._partition, "query", [text])
+        vectors = [await self.embeddings.aembed_query(text)] if missing else []
+        return (await asyncio.to_thread(self._merge, keys, cached, list(missing), vectors))[0]
@@ -1,25 +1,42 @@
 from fastapi import FastAPI, File, UploadFile, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import ORJSONResponse
 from pydantic import BaseModel
 import os
+import asyncio
 import tempfile
-import json
+import mmap
+import shutil
+import threading
 import uuid
+from collections import OrderedDict
+from dataclasses import dataclass
 from datetime import datetime
-from typing import Dict, Any, Optional, List
-from pathlib import Path
+from functools import lru_cache
+from typing import Dict, Any, Optional, List, Sequence, Tuple
+
+import charset_normalizer
+import faiss
+import numpy as np
+import orjson
 
-from langchain_community.document_loaders import PyPDFLoader, TextLoader
 from langchain.text_splitter import RecursiveCharacterTextSplitter
-from langchain_community.vectorstores import FAISS
+try:
+    from semantic_text_splitter import TextSplitter
+except ImportError:
+    TextSplitter = None
+from langchain_core.documents import Document
 from langchain_google_genai import GoogleGenerativeAIEmbeddings, ChatGoogleGenerativeAI
-from langchain.chains.retrieval_qa.base import RetrievalQA
+from langchain.chains.question_answering import load_qa_chain
 from langchain.prompts import PromptTemplate
 
+from api_helpers import extract_pdf_pages, shutdown_pdf_pool, start_llm_warm_up, start_pdf_pool
+from embedding_cache import CachedEmbeddings
+
 from dotenv import load_dotenv
 load_dotenv()
 
-app = FastAPI(title="Enhanced Document Q&A API", version="2.0")
+app = FastAPI(title="Enhanced Document Q&A API", version="2.0", default_response_class=ORJSONResponse)
 
 app.add_middleware(
     CORSMiddleware,
@@ -46,8 +63,81 @@ class AnswerResponse(BaseModel):
     clause: Optional[str] = None
     document_references: Optional[List[str]] = None
 
+class ChunkTexts(Sequence):
+    """Chunk texts read on demand from a memory-mapped JSON-lines file"""
+    
+    def __init__(self, path: str):
+        with open(path, "rb") as f:
+            self._mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        newlines = np.flatnonzero(np.frombuffer(self._mm, dtype=np.uint8) == ord("\n"))
+        self._ends = newlines
+        self._starts = np.concatenate(([0], newlines[:-1] + 1))
+    
+    def __len__(self) -> int:
+        return len(self._ends)
+    
+    def __getitem__(self, i: int) -> str:
+        return orjson.loads(self._mm[self._starts[i]:self._ends[i]])
+    
+    def close(self):
+        """Unmap the file and release its descriptor"""
+        if hasattr(self, "_mm"):
+            self._mm.close()
+    
+    def __del__(self):
+        self.close()
+
+@dataclass(slots=True)
+class VectorStore:
+    """Raw FAISS inner-product index over normalized vectors plus chunk texts"""
+    index: faiss.Index
+    texts: Sequence[str]
+    
+    def search(self, query_vector: np.ndarray, k: int) -> List[str]:
+        query = np.array(query_vector, dtype=np.float32).reshape(1, -1)
+        faiss.normalize_L2(query)
+        _, ids = self.index.search(query, k)
+        return [self.texts[i] for i in ids[0] if i != -1]
+    
+    def close(self):
+        if isinstance(self.texts, ChunkTexts):
+            self.texts.close()
+
 sessions: Dict[str, Dict[str, Any]] = {}
 SESSIONS_DIR = "sessions"
+# With REDIS_URL set, session metadata lives in Redis so any worker can serve
+# any session; the on-disk index under SESSIONS_DIR stays the source of truth
+REDIS_URL = os.getenv("REDIS_URL")
+SESSION_TTL_SECONDS = 3600
+if REDIS_URL:
+    import redis.asyncio as redis
+    redis_client = redis.Redis.from_url(REDIS_URL, decode_responses=True)
+else:
+    redis_client = None
+# Maximum number of texts the Google embedding endpoint accepts per request
+EMBED_BATCH_SIZE = 100
+# Embedding requests allowed in flight at once for a single upload
+EMBED_MAX_CONCURRENCY = 5
+# Loaded vector stores by session, least recently used first
+# Evicted stores are not closed: a request may still be using one, and
+# ChunkTexts unmaps itself once the last reference is gone
+vector_store_cache: "OrderedDict[str, VectorStore]" = OrderedDict()
+vector_store_lock = threading.Lock()
+VECTOR_STORE_CACHE_SIZE = 16
+# Recent (normalized question vector, answer) pairs per session, so
+# repeated or near-identical questions skip retrieval and the LLM
+semantic_cache: Dict[str, List[Tuple[np.ndarray, Dict[str, Any]]]] = {}
+SEMANTIC_CACHE_SIZE = 100
+SEMANTIC_CACHE_THRESHOLD = 0.97
+# Documents parsed at the same time; parsing is CPU-bound, so more threads
+# would only contend for the GIL
+document_semaphore = asyncio.Semaphore(2)
+# Uploads are copied to disk in chunks of this many bytes
+UPLOAD_CHUNK_SIZE = 1 << 20
+TEXT_EXTENSIONS = frozenset({".txt", ".eml"})
+ALLOWED_EXTENSIONS = frozenset({".pdf"}) | TEXT_EXTENSIONS
+# Below this many chunks a flat float32 index is small enough that quantizing buys nothing
+QUANTIZE_MIN_VECTORS = 500
 GOOGLE_API_KEY = os.getenv("GOOGLE_API_KEY")
 
 os.makedirs(SESSIONS_DIR, exist_ok=True)
@@ -55,46 +145,79 @@ os.makedirs(SESSIONS_DIR, exist_ok=True)
 if not GOOGLE_API_KEY:
     raise ValueError("GOOGLE_API_KEY environment variable is required")
 
-embeddings = GoogleGenerativeAIEmbeddings(
-    model="models/embedding-001",
-    google_api_key=GOOGLE_API_KEY
+# Embeddings are only called synchronously (from worker threads), so they can
+# use the REST transport, which keeps HTTP connections alive across requests;
+# vectors are cached by content hash so re-uploaded chunks are not re-embedded
+embeddings = CachedEmbeddings(
+    GoogleGenerativeAIEmbeddings(
+        model="models/embedding-001",
+        google_api_key=GOOGLE_API_KEY,
+        transport="rest"
+    ),
+    namespace="models/embedding-001"
 )
 
+# The chat model is awaited, and the async client only works over gRPC
 llm = ChatGoogleGenerativeAI(
     model="gemini-1.5-flash",
     google_api_key=GOOGLE_API_KEY,
     temperature=0.1
 )
 
-def process_pdf_document_safe(file_path: str) -> List[str]:
+# Shared by every document type instead of being rebuilt per document;
+# the Rust splitter is much faster on large documents when it is installed
+if TextSplitter is not None:
+    text_splitter = TextSplitter(capacity=1000, overlap=200)
+    split_text = text_splitter.chunks
+else:
+    text_splitter = RecursiveCharacterTextSplitter(
+        chunk_size=1000,
+        chunk_overlap=200,
+        separators=["\n\n", "\n", "。", ". ", " "],
+        length_function=len,
+        keep_separator=False,
+        is_separator_regex=False,
+    )
+    split_text = text_splitter.split_text
+
+PROMPT_TEMPLATE = """
+You are an expert document analyzer. Based on the provided context, answer the question with a short, direct response.
+
+Context: {context}
+
+Question: {question}
+
+Instructions:
+1. Provide a very short answer (preferably Yes/No if applicable)
+2. If the information is not in the document, say "Information not found in document"
+3. Be concise and direct
+4. Include the most relevant clause or section if applicable
+
+Answer in JSON format:
+{{
+    "answer": "Short direct answer here",
+    "confidence_score": 0.8,
+    "reason": "Brief explanation",
+    "clause": "Relevant text from document if applicable"
+}}
+"""
+
+PROMPT = PromptTemplate(
+    template=PROMPT_TEMPLATE,
+    input_variables=["context", "question"]
+)
+
+qa_chain = load_qa_chain(llm, prompt=PROMPT, chain_type="stuff")
+
+async def process_pdf_document_safe(file_path: str) -> List[str]:
     """Process PDF document safely with UTF-8 handling"""
     try:
-        from pypdf import PdfReader
-        
-        text = ""
-        with open(file_path, 'rb') as file:
-            pdf_reader = PdfReader(file)
-            for page_num, page in enumerate(pdf_reader.pages):
-                try:
-                    extracted = page.extract_text()
-                    if extracted:
-                        # Ensure UTF-8 compatibility
-                        clean_text = extracted.encode('utf-8', errors='ignore').decode('utf-8')
-                        text += clean_text + "\n"
-                except Exception as e:
-                    # Log error but continue processing
-                    text += f"\n[Error reading page {page_num + 1}: Unable to extract text]\n"
+        text = "\n".join(await extract_pdf_pages(file_path))
         
         if not text.strip():
             raise Exception("No readable text found in PDF")
         
-        text_splitter = RecursiveCharacterTextSplitter(
-            chunk_size=1000,
-            chunk_overlap=200,
-            length_function=len,
-        )
-        
-        chunks = text_splitter.split_text(text)
+        chunks = await asyncio.to_thread(split_text, text)
         print(f"PDF processed successfully. Created {len(chunks)} text chunks.")
         return chunks
     
@@ -104,48 +227,69 @@ def process_pdf_document_safe(file_path: str) -> List[str]:
 def process_text_document_safe(file_path: str) -> List[str]:
     """Process text document safely with UTF-8 handling"""
     try:
-        # Try different encodings
-        encodings = ['utf-8', 'latin-1', 'cp1252', 'iso-8859-1']
-        text = ""
-        
-        for encoding in encodings:
-            try:
-                with open(file_path, 'r', encoding=encoding, errors='ignore') as f:
-                    text = f.read()
-                print(f"Text file read successfully with {encoding} encoding.")
-                break
-            except UnicodeDecodeError:
-                continue
+        # Detect the encoding in one pass rather than decoding with errors ignored
+        best = charset_normalizer.from_path(file_path).best()
+        if best is not None:
+            text = str(best)
+            print(f"Text file read successfully with {best.encoding} encoding.")
+        else:
+            with open(file_path, 'r', encoding='utf-8', errors='replace') as f:
+                text = f.read()
         
         if not text.strip():
             raise Exception("No readable text found in file")
         
-        text_splitter = RecursiveCharacterTextSplitter(
-            chunk_size=1000,
-            chunk_overlap=200,
-            length_function=len,
-        )
-        
-        chunks = text_splitter.split_text(text)
+        chunks = split_text(text)
         print(f"Text file processed successfully. Created {len(chunks)} text chunks.")
         return chunks
     
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error processing text file: {str(e)}")
 
-def create_vector_store(texts: List[str], session_id: str) -> FAISS:
+async def embed_batches_concurrent(texts: List[str]) -> List[List[float]]:
+    """Embed texts in batches, with up to EMBED_MAX_CONCURRENCY requests in flight"""
+    semaphore = asyncio.Semaphore(EMBED_MAX_CONCURRENCY)
+    
+    async def embed_one(batch: List[str]) -> List[List[float]]:
+        async with semaphore:
+            return await asyncio.to_thread(embeddings.embed_documents, batch)
+    
+    tasks = [
+        asyncio.create_task(embed_one(texts[start:start + EMBED_BATCH_SIZE]))
+        for start in range(0, len(texts), EMBED_BATCH_SIZE)
+    ]
+    # gather returns results in task order, so vectors line up with texts
+    results = await asyncio.gather(*tasks)
+    return [vector for batch_vectors in results for vector in batch_vectors]
+
+async def create_vector_store(texts: List[str], session_id: str) -> VectorStore:
     """Create FAISS vector store from text chunks"""
     try:
-        # Clean texts to ensure UTF-8 compatibility
-        clean_texts = []
-        for text in texts:
-            clean_text = text.encode('utf-8', errors='ignore').decode('utf-8')
-            clean_texts.append(clean_text)
+        # Texts were already made UTF-8 safe when they were extracted
+        vectors = await embed_batches_concurrent(texts)
         
-        vector_store = FAISS.from_texts(clean_texts, embeddings)
+        # Cosine similarity as inner product over L2-normalized vectors
+        matrix = np.asarray(vectors, dtype=np.float32)
+        faiss.normalize_L2(matrix)
+        if len(matrix) < QUANTIZE_MIN_VECTORS:
+            index = faiss.IndexFlatIP(matrix.shape[1])
+        else:
+            # 8-bit codes take a quarter of the memory of float32 vectors;
+            # the per-dimension ranges are learned from the document itself
+            index = faiss.IndexScalarQuantizer(
+                matrix.shape[1], faiss.ScalarQuantizer.QT_8bit, faiss.METRIC_INNER_PRODUCT
+            )
+            index.train(matrix)
+        index.add(matrix)
+        vector_store = VectorStore(index=index, texts=texts)
         
+        # The index and one JSON-encoded chunk text per line replace LangChain's pickled docstore
         vector_store_path = os.path.join(SESSIONS_DIR, f"{session_id}_vectorstore")
-        vector_store.save_local(vector_store_path)
+        os.makedirs(vector_store_path, exist_ok=True)
+        faiss.write_index(index, os.path.join(vector_store_path, "index.faiss"))
+        with open(os.path.join(vector_store_path, "texts.jsonl"), "wb") as f:
+            f.writelines(orjson.dumps(text) + b"\n" for text in texts)
+        cache_vector_store(session_id, vector_store)
         
         print(f"Vector store created successfully for session {session_id}")
         return vector_store
@@ -153,82 +297,142 @@ def create_vector_store(texts: List[str], session_id: str) -> FAISS:
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error creating vector store: {str(e)}")
 
-def load_vector_store(session_id: str) -> FAISS:
+def cache_vector_store(session_id: str, vector_store: VectorStore):
+    """Keep a vector store in memory, evicting the least recently used"""
+    with vector_store_lock:
+        vector_store_cache[session_id] = vector_store
+        vector_store_cache.move_to_end(session_id)
+        while len(vector_store_cache) > VECTOR_STORE_CACHE_SIZE:
+            vector_store_cache.popitem(last=False)
+
+def load_vector_store(session_id: str) -> VectorStore:
     """Load existing vector store"""
+    with vector_store_lock:
+        if session_id in vector_store_cache:
+            vector_store_cache.move_to_end(session_id)
+            return vector_store_cache[session_id]
+    
     try:
         vector_store_path = os.path.join(SESSIONS_DIR, f"{session_id}_vectorstore")
-        vector_store = FAISS.load_local(vector_store_path, embeddings, allow_dangerous_deserialization=True)
+        # IO_FLAG_MMAP only maps IVF inverted lists, so the flat and scalar-quantized
+        # indexes written here are still read into each worker's memory; only the
+        # chunk texts are shared through the page cache
+        index = faiss.read_index(
+            os.path.join(vector_store_path, "index.faiss"),
+            faiss.IO_FLAG_MMAP | faiss.IO_FLAG_READ_ONLY
+        )
+        texts = ChunkTexts(os.path.join(vector_store_path, "texts.jsonl"))
+        vector_store = VectorStore(index=index, texts=texts)
+        cache_vector_store(session_id, vector_store)
         return vector_store
     
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error loading vector store: {str(e)}")
 
-def get_document_answer(question: str, vector_store: FAISS) -> Dict[str, Any]:
-    """Get answer from document using LangChain with UTF-8 safe processing"""
-    
-    prompt_template = """
-You are an expert document analyzer. Based on the provided context, answer the question with a short, direct response.
+async def save_session(session_id: str, info: Dict[str, Any]):
+    """Record session metadata locally and, if configured, in Redis"""
+    sessions[session_id] = info
+    if redis_client is not None:
+        key = f"sess:{session_id}"
+        await redis_client.hset(key, mapping=info)
+        await redis_client.expire(key, SESSION_TTL_SECONDS)
 
-Context: {context}
+async def get_session(session_id: str) -> Optional[Dict[str, Any]]:
+    """Look up session metadata, falling back to Redis and then to the saved index"""
+    info = sessions.get(session_id)
+    if info is None and redis_client is not None:
+        info = await redis_client.hgetall(f"sess:{session_id}") or None
+    if info is None and is_session_id(session_id):
+        # The index on disk is authoritative, so sessions survive restarts and
+        # are visible to every worker even without Redis
+        vector_store_path = os.path.join(SESSIONS_DIR, f"{session_id}_vectorstore")
+        if os.path.exists(os.path.join(vector_store_path, "index.faiss")):
+            info = {"vector_store_path": vector_store_path}
+    # Fallback results are not kept in sessions, so a delete on another worker
+    # is seen here on the next lookup
+    return info
 
-Question: {question}
+def is_session_id(session_id: str) -> bool:
+    """Only generated UUIDs may be turned into paths under SESSIONS_DIR"""
+    try:
+        return str(uuid.UUID(session_id)) == session_id
+    except ValueError:
+        return False
 
-Instructions:
-1. Provide a very short answer (preferably Yes/No if applicable)
-2. If the information is not in the document, say "Information not found in document"
-3. Be concise and direct
-4. Include the most relevant clause or section if applicable
+@lru_cache(maxsize=2048)
+def embed_query_cached(question: str) -> Tuple[float, ...]:
+    """Memoize question embeddings; embedding-001 is deterministic per text"""
+    return tuple(embeddings.embed_query(question))
 
-Answer in JSON format:
-{{
-    "answer": "Short direct answer here",
-    "confidence_score": 0.8,
-    "reason": "Brief explanation",
-    "clause": "Relevant text from document if applicable"
-}}
-"""
+def semantic_cache_path(session_id: str) -> str:
+    return os.path.join(SESSIONS_DIR, f"{session_id}_semcache.npz")
 
-    PROMPT = PromptTemplate(
-        template=prompt_template,
-        input_variables=["context", "question"]
-    )
+def lookup_semantic_cache(session_id: str, question_vector: np.ndarray) -> Optional[Dict[str, Any]]:
+    """Return a cached answer for a question similar enough to this one"""
+    if session_id not in semantic_cache and os.path.exists(semantic_cache_path(session_id)):
+        saved = np.load(semantic_cache_path(session_id))
+        semantic_cache[session_id] = [
+            (vector, orjson.loads(str(answer))) for vector, answer in zip(saved["vectors"], saved["answers"])
+        ]
     
+    entries = semantic_cache.get(session_id)
+    if not entries:
+        return None
+    similarities = np.stack([vector for vector, _ in entries]) @ question_vector
+    best = int(np.argmax(similarities))
+    if similarities[best] > SEMANTIC_CACHE_THRESHOLD:
+        return dict(entries[best][1])
+    return None
+
+def store_semantic_cache(session_id: str, question_vector: np.ndarray, answer_data: Dict[str, Any]):
+    entries = semantic_cache.setdefault(session_id, [])
+    entries.append((question_vector, dict(answer_data)))
+    if len(entries) > SEMANTIC_CACHE_SIZE:
+        entries.pop(0)
+
+async def get_document_answer(question: str, session_id: str) -> Dict[str, Any]:
+    """Get answer from document using LangChain with UTF-8 safe processing"""
     try:
-        qa_chain = RetrievalQA.from_chain_type(
-            llm=llm,
-            chain_type="stuff",
-            retriever=vector_store.as_retriever(search_kwargs={"k": 3}),
-            chain_type_kwargs={"prompt": PROMPT},
-            return_source_documents=True
-        )
+        # Embed the question once and reuse it for the cache and the search
+        question_vector = np.asarray(await asyncio.to_thread(embed_query_cached, question), dtype=np.float32)
+        question_vector /= np.linalg.norm(question_vector)
+        cached = lookup_semantic_cache(session_id, question_vector)
+        if cached is not None:
+            print("Question answered from semantic cache.")
+            return cached
         
-        result = qa_chain({"query": question})
+        # A cold load reads the index and scans the texts file, so both the
+        # load and the search stay off the event loop
+        vector_store = await asyncio.to_thread(load_vector_store, session_id)
+        source_texts = await asyncio.to_thread(vector_store.search, question_vector, 3)
+        source_documents = [Document(page_content=text) for text in source_texts]
+        result = await qa_chain.ainvoke({"input_documents": source_documents, "question": question})
         
-        # Safely handle the response with UTF-8 encoding
-        response_text = result["result"]
-        clean_response = response_text.encode('utf-8', errors='ignore').decode('utf-8')
+        response_text = result["output_text"]
         
         try:
-            answer_data = json.loads(clean_response)
-        except json.JSONDecodeError:
+            answer_data = orjson.loads(response_text)
+        except orjson.JSONDecodeError:
             answer_data = {
-                "answer": clean_response[:200],
+                "answer": response_text[:200],
                 "confidence_score": 0.5,
                 "reason": "Direct response from model",
                 "clause": None
             }
         
         # Clean source documents
-        if result["source_documents"]:
+        if source_documents:
             clean_refs = []
-            for i, doc in enumerate(result["source_documents"][:2]):
-                clean_content = doc.page_content.encode('utf-8', errors='ignore').decode('utf-8')
-                clean_refs.append(f"Source {i+1}: ...{clean_content[:100]}...")
+            for i, doc in enumerate(source_documents[:2]):
+                clean_refs.append(f"Source {i+1}: ...{doc.page_content[:100]}...")
             answer_data["document_references"] = clean_refs
         
+        store_semantic_cache(session_id, question_vector, answer_data)
         print("Question processed successfully.")
         return answer_data
     
+    except HTTPException:
+        raise
     except Exception as e:
         print(f"Error in question processing: {str(e)}")
         return {
@@ -242,34 +446,39 @@ Answer in JSON format:
 async def upload_document(file: UploadFile = File(...)):
     """Upload and process a document with UTF-8 safe handling"""
     
+    file_extension = os.path.splitext(file.filename)[1].lower()
+    # Reject before anything is written to disk
+    if file_extension not in ALLOWED_EXTENSIONS:
+        raise HTTPException(status_code=400, detail=f"Unsupported file type: {file_extension}")
+    
     session_id = str(uuid.uuid4())
     
     try:
         with tempfile.NamedTemporaryFile(delete=False, suffix=f"_{file.filename}") as temp_file:
-            content = await file.read()
-            temp_file.write(content)
             temp_file_path = temp_file.name
+            # Copy in 1 MiB chunks so the whole upload is never held in memory
+            while chunk := await file.read(UPLOAD_CHUNK_SIZE):
+                temp_file.write(chunk)
         
-        file_extension = Path(file.filename).suffix.lower()
-        
+        # Parse in a worker thread so other requests keep being served
         if file_extension == '.pdf':
-            texts = process_pdf_document_safe(temp_file_path)
+            async with document_semaphore:
+                texts = await process_pdf_document_safe(temp_file_path)
             document_type = "PDF"
-        elif file_extension in ['.txt', '.eml']:
-            texts = process_text_document_safe(temp_file_path)
-            document_type = "Text/Email"
         else:
-            raise HTTPException(status_code=400, detail=f"Unsupported file type: {file_extension}")
+            async with document_semaphore:
+                texts = await asyncio.to_thread(process_text_document_safe, temp_file_path)
+            document_type = "Text/Email"
         
-        vector_store = create_vector_store(texts, session_id)
+        vector_store = await create_vector_store(texts, session_id)
         
-        sessions[session_id] = {
+        await save_session(session_id, {
             "filename": file.filename,
             "document_type": document_type,
             "pages_processed": len(texts),
             "created_at": datetime.now().isoformat(),
             "vector_store_path": os.path.join(SESSIONS_DIR, f"{session_id}_vectorstore")
-        }
+        })
         
         os.unlink(temp_file_path)
         
@@ -296,27 +505,69 @@ async def upload_document(file: UploadFile = File(...)):
 async def ask_question(request: QuestionRequest):
     """Ask a question about the uploaded document with UTF-8 safe handling"""
     
-    if request.session_id not in sessions:
+    if await get_session(request.session_id) is None:
         raise HTTPException(status_code=404, detail="Session not found. Please upload a document first.")
     
     try:
-        vector_store = load_vector_store(request.session_id)
-        
-        answer_data = get_document_answer(request.question, vector_store)
+        answer_data = await get_document_answer(request.question, request.session_id)
         
         return AnswerResponse(**answer_data)
     
+    except HTTPException:
+        raise
     except Exception as e:
         print(f"Error processing question: {str(e)}")
         raise HTTPException(status_code=500, detail=f"Error processing question: {str(e)}")
 
+@app.delete("/sessions/{session_id}")
+async def delete_session(session_id: str):
+    """Delete a session, its cached index and answers, and its files"""
+    if await get_session(session_id) is None:
+        raise HTTPException(status_code=404, detail="Session not found")
+    
+    sessions.pop(session_id, None)
+    if redis_client is not None:
+        await redis_client.delete(f"sess:{session_id}")
+    
+    # Unmap the cached texts so the kernel can reclaim their pages
+    with vector_store_lock:
+        vector_store = vector_store_cache.pop(session_id, None)
+    if vector_store is not None:
+        vector_store.close()
+    semantic_cache.pop(session_id, None)
+    
+    shutil.rmtree(os.path.join(SESSIONS_DIR, f"{session_id}_vectorstore"), ignore_errors=True)
+    if os.path.exists(semantic_cache_path(session_id)):
+        os.unlink(semantic_cache_path(session_id))
+    
+    return {"message": f"Session {session_id} deleted successfully"}
+
+# PDFium is not thread-safe, so PDFs are extracted in a process pool
+app.add_event_handler("startup", start_pdf_pool)
+app.add_event_handler("shutdown", shutdown_pdf_pool)
+
+@app.on_event("startup")
+async def warm_up_llm():
+    app.state.llm_warm_up = start_llm_warm_up(llm)
+
+@app.on_event("shutdown")
+def save_semantic_caches():
+    """Persist semantic caches so answers survive a restart"""
+    for session_id, entries in semantic_cache.items():
+        if entries:
+            np.savez(
+                semantic_cache_path(session_id),
+                vectors=np.stack([vector for vector, _ in entries]),
+                answers=np.array([orjson.dumps(answer).decode() for _, answer in entries])
+            )
+
 @app.get("/")
 async def root():
     return {
         "message": "Enhanced Document Q&A API v2.0",
         "status": "running",
         "supported_formats": ["PDF", "TXT", "EML"],
-        "endpoints": ["/upload-document", "/ask-question"]
+        "endpoints": ["POST /upload-document", "POST /ask-question", "DELETE /sessions/{session_id}"]
     }
 
 @app.get("/health")
@@ -1,5 +1,7 @@
 import streamlit as st
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 import json
 import os
 from dotenv import load_dotenv
@@ -25,14 +27,32 @@ if 'chat_history' not in st.session_state:
 if 'document_info' not in st.session_state:
     st.session_state.document_info = None
 
+# Only the most recent turns are re-rendered on each rerun
+HISTORY_PAGE_SIZE = 20
+if 'history_shown' not in st.session_state:
+    st.session_state.history_shown = HISTORY_PAGE_SIZE
+
 # API Configuration
 API_BASE_URL = "http://localhost:8001"  # Enhanced API runs on port 8001
 
-def upload_document_to_api(file_content, filename):
+@st.cache_resource
+def get_http_session():
+    """Keep-alive HTTP session shared across reruns, so calls reuse connections"""
+    session = requests.Session()
+    adapter = HTTPAdapter(
+        pool_connections=10,
+        pool_maxsize=10,
+        max_retries=Retry(total=3, backoff_factor=0.2)
+    )
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
+
+def upload_document_to_api(file_obj, filename):
     """Upload document to the enhanced API"""
     try:
-        files = {'file': (filename, file_content, 'application/octet-stream')}
-        response = requests.post(f"{API_BASE_URL}/upload-document", files=files)
+        files = {'file': (filename, file_obj, 'application/octet-stream')}
+        response = get_http_session().post(f"{API_BASE_URL}/upload-document", files=files)
         
         if response.status_code == 200:
             return response.json()
@@ -50,7 +70,7 @@ def ask_question_to_api(question, session_id):
             "question": question,
             "session_id": session_id
         }
-        response = requests.post(f"{API_BASE_URL}/ask-question", json=payload)
+        response = get_http_session().post(f"{API_BASE_URL}/ask-question", json=payload)
         
         if response.status_code == 200:
             return response.json()
@@ -61,7 +81,7 @@ def ask_question_to_api(question, session_id):
         st.error(f"Error asking question: {str(e)}")
         return None
 
-def display_response(response_data):
+def display_response(response_data, show_progress=True):
     """Display API response in a structured format"""
     if not response_data:
         return
@@ -75,7 +95,8 @@ def display_response(response_data):
     st.markdown(f"**Confidence:** {confidence:.1%}")
     
     # Progress bar for confidence
-    st.progress(confidence)
+    if show_progress:
+        st.progress(confidence)
     
     # Reason (if provided)
     if response_data.get('reason'):
@@ -110,9 +131,9 @@ with st.sidebar:
     if uploaded_file is not None:
         if st.button("🚀 Process Document", type="primary"):
             with st.spinner("Processing document..."):
-                file_content = uploaded_file.read()
-                
-                result = upload_document_to_api(file_content, uploaded_file.name)
+                # Pass the file object so requests reads it directly rather than
+                # from a second bytes copy
+                result = upload_document_to_api(uploaded_file, uploaded_file.name)
                 
                 if result:
                     st.session_state.session_id = result['session_id']
@@ -137,6 +158,7 @@ with st.sidebar:
             st.session_state.session_id = None
             st.session_state.document_info = None
             st.session_state.chat_history = []
+            st.session_state.history_shown = HISTORY_PAGE_SIZE
             st.rerun()
 
 # Main content area
@@ -163,14 +185,20 @@ if st.session_state.session_id:
     st.markdown("### 💬 Ask Questions About Your Document")
     
     # Display chat history
-    for i, chat in enumerate(st.session_state.chat_history):
+    history = st.session_state.chat_history
+    hidden = max(len(history) - st.session_state.history_shown, 0)
+    if hidden and st.button(f"⬆️ Load earlier ({hidden} more)"):
+        st.session_state.history_shown += HISTORY_PAGE_SIZE
+        st.rerun()
+    
+    for i, chat in enumerate(history[hidden:], start=hidden):
         # User question
         with st.chat_message("user"):
             st.markdown(chat['question'])
         
         # Assistant response
         with st.chat_message("assistant"):
-            display_response(chat['response'])
+            display_response(chat['response'], show_progress=i == len(history) - 1)
     
     # Question input
     user_question = st.chat_input("Ask anything about your document...")
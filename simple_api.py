@@ -1,29 +1,109 @@
 from fastapi import FastAPI, File, UploadFile, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
-from pydantic import BaseModel
+from fastapi.responses import ORJSONResponse
+from pydantic import BaseModel, Field
 import os
-import json
+import asyncio
+import orjson
 import uuid
 import tempfile
-from typing import Dict, Any
+import threading
+import zlib
+from collections import OrderedDict
+from typing import Dict, Any, List
 from pathlib import Path
 
-# Simple imports that work
-try:
-    from pypdf import PdfReader
-except ImportError:
-    from PyPDF2 import PdfReader
+import faiss
+import numpy as np
 
 from langchain_text_splitters import RecursiveCharacterTextSplitter
+try:
+    from semantic_text_splitter import TextSplitter
+except ImportError:
+    TextSplitter = None
 from langchain_google_genai import GoogleGenerativeAIEmbeddings, ChatGoogleGenerativeAI
 from langchain_community.vectorstores import FAISS
-from langchain.chains.question_answering import load_qa_chain
-from langchain.prompts import PromptTemplate
+from langchain_community.docstore.in_memory import InMemoryDocstore
+from langchain_core.documents import Document
+
+from api_helpers import extract_pdf_pages, shutdown_pdf_pool, start_llm_warm_up, start_pdf_pool
+from embedding_cache import CachedEmbeddings
 from dotenv import load_dotenv
 
 load_dotenv()
 
-app = FastAPI(title="Simple PDF Q&A API", version="1.0")
+app = FastAPI(title="Simple PDF Q&A API", version="1.0", default_response_class=ORJSONResponse)
+
+# Uploads are copied to disk in chunks of this many bytes
+UPLOAD_CHUNK_SIZE = 1 << 20
+# Largest upload accepted, before or after gzip decompression
+MAX_UPLOAD_BYTES = 100 * 1024 * 1024
+
+class GzipRequestMiddleware:
+    """Decompress request bodies sent with Content-Encoding: gzip as they stream in"""
+    
+    def __init__(self, app):
+        self.app = app
+    
+    async def __call__(self, scope, receive, send):
+        headers = dict(scope.get("headers", []))
+        if scope["type"] != "http" or headers.get(b"content-encoding") != b"gzip":
+            await self.app(scope, receive, send)
+            return
+        
+        # The decompressed length is not known up front, so downstream reads
+        # the body until more_body is False instead of trusting Content-Length
+        headers.pop(b"content-encoding")
+        headers.pop(b"content-length", None)
+        scope = {**scope, "headers": list(headers.items())}
+        
+        decompressor = zlib.decompressobj(16 + zlib.MAX_WBITS)
+        more_body = True
+        total = 0
+        error = None
+        
+        async def receive_body():
+            nonlocal more_body, total, error
+            while True:
+                try:
+                    if decompressor.unconsumed_tail:
+                        data = decompressor.decompress(decompressor.unconsumed_tail, UPLOAD_CHUNK_SIZE)
+                    elif more_body:
+                        message = await receive()
+                        if message["type"] == "http.disconnect":
+                            return message
+                        more_body = message.get("more_body", False)
+                        data = decompressor.decompress(message.get("body", b""), UPLOAD_CHUNK_SIZE)
+                    else:
+                        if not decompressor.eof:
+                            raise zlib.error("truncated gzip stream")
+                        return {"type": "http.request", "body": b"", "more_body": False}
+                except zlib.error:
+                    error = HTTPException(status_code=400, detail="Invalid gzip request body")
+                    raise error
+                
+                # Output is produced at most one chunk at a time, so a small
+                # body that inflates to gigabytes is cut off at the cap
+                total += len(data)
+                if total > MAX_UPLOAD_BYTES:
+                    error = HTTPException(status_code=413, detail="Upload too large")
+                    raise error
+                if data:
+                    return {"type": "http.request", "body": data, "more_body": True}
+        
+        async def send_response(message):
+            # Once the body is rejected, the app's own error response is replaced
+            if error is None:
+                await send(message)
+        
+        try:
+            await self.app(scope, receive_body, send_response)
+        except HTTPException:
+            if error is None:
+                raise
+        if error is not None:
+            response = ORJSONResponse({"detail": error.detail}, status_code=error.status_code)
+            await response(scope, receive, send)
 
 app.add_middleware(
     CORSMiddleware,
@@ -32,6 +112,7 @@ app.add_middleware(
     allow_methods=["*"],
     allow_headers=["*"],
 )
+app.add_middleware(GzipRequestMiddleware)
 
 class QuestionRequest(BaseModel):
     question: str
@@ -47,71 +128,68 @@ class AnswerResponse(BaseModel):
     clause: str
     session_id: str
 
+# Largest batch /ask-questions accepts, and how many of its questions are
+# answered at once across all requests, so one batch cannot flood the LLM
+MAX_QUESTIONS_PER_REQUEST = 50
+BATCH_MAX_CONCURRENCY = 8
+batch_semaphore = asyncio.Semaphore(BATCH_MAX_CONCURRENCY)
+
+class QuestionsRequest(BaseModel):
+    questions: List[str] = Field(max_length=MAX_QUESTIONS_PER_REQUEST)
+    session_id: str
+
+class AnswersResponse(BaseModel):
+    answers: List[AnswerResponse]
+
 # Simple session storage
 sessions = {}
 
+# Maximum number of texts the Google embedding endpoint accepts per request
+EMBED_BATCH_SIZE = 100
+# Embedding requests allowed in flight at once for a single upload
+EMBED_MAX_CONCURRENCY = 8
+
+# Below this many chunks an HNSW graph over 8-bit scalar-quantized vectors
+# (a quarter of float32's size) keeps recall high; above it vectors are
+# product-quantized into inverted lists
+IVFPQ_MIN_VECTORS = 2000
+
+# Loaded FAISS stores, least recently used first, so warm sessions skip the disk
+vector_store_cache = OrderedDict()
+VECTOR_STORE_CACHE_SIZE = 16
+vector_store_lock = threading.Lock()
+
+# Per-session (question index, answers) pairs; a question whose embedding is
+# this close to an earlier one reuses that answer instead of calling the LLM
+question_caches = {}
+QUESTION_CACHE_THRESHOLD = 0.92
+# Questions kept per session; the oldest are dropped first
+QUESTION_CACHE_SIZE = 100
+# Serializes writes of each session's question cache files
+question_cache_locks = {}
+
 # Get environment variables
 GOOGLE_API_KEY = os.getenv("GOOGLE_API_KEY")
 if not GOOGLE_API_KEY:
     raise ValueError("GOOGLE_API_KEY required")
 
-def extract_text_from_pdf(file_path: str) -> str:
-    """Simple PDF text extraction"""
-    text = ""
-    try:
-        with open(file_path, 'rb') as file:
-            pdf_reader = PdfReader(file)
-            for page in pdf_reader.pages:
-                page_text = page.extract_text()
-                if page_text:
-                    text += page_text + " "
-    except Exception:
-        text = "Error reading PDF"
-    return text
-
-def create_chunks(text: str):
-    """Create text chunks"""
-    splitter = RecursiveCharacterTextSplitter(
-        chunk_size=1000,
-        chunk_overlap=200
-    )
-    return splitter.split_text(text)
-
-def create_embeddings_store(chunks, session_id: str):
-    """Create FAISS store"""
-    embeddings = GoogleGenerativeAIEmbeddings(
+# Clients and prompt are built once and shared by every request;
+# vectors are cached by content hash so re-uploaded chunks are not re-embedded
+embeddings = CachedEmbeddings(
+    GoogleGenerativeAIEmbeddings(
         model="models/embedding-001",
         google_api_key=GOOGLE_API_KEY
-    )
-    
-    store = FAISS.from_texts(chunks, embeddings)
-    
-    # Save to session directory
-    os.makedirs("sessions", exist_ok=True)
-    store.save_local(f"sessions/{session_id}")
-    
-    return store
+    ),
+    namespace="models/embedding-001"
+)
 
-def get_answer(question: str, session_id: str):
-    """Get answer from stored documents"""
-    try:
-        embeddings = GoogleGenerativeAIEmbeddings(
-            model="models/embedding-001",
-            google_api_key=GOOGLE_API_KEY
-        )
-        
-        # Load store
-        store = FAISS.load_local(
-            f"sessions/{session_id}", 
-            embeddings, 
-            allow_dangerous_deserialization=True
-        )
-        
-        # Get relevant docs
-        docs = store.similarity_search(question, k=3)
-        
-        # Create prompt
-        prompt_template = """
+llm = ChatGoogleGenerativeAI(
+    model="gemini-1.5-flash",
+    google_api_key=GOOGLE_API_KEY,
+    temperature=0.1
+)
+
+PROMPT_TEMPLATE = """
 You are a helpful assistant that answers questions about insurance policies based on the provided context.
 
 Sample Query: "46M, knee surgery, Pune, 3-month policy"
@@ -141,51 +219,198 @@ Context: {context}
 Question: {question}
 
 Answer:"""
+
+async def extract_text_from_pdf(file_path: str) -> str:
+    """Simple PDF text extraction in the shared worker pool"""
+    try:
+        pages = await extract_pdf_pages(file_path)
+    except Exception:
+        return "Error reading PDF"
+    return " ".join(pages)
+
+# Built once; the Rust splitter is used when installed, LangChain's otherwise
+if TextSplitter is not None:
+    splitter = TextSplitter(capacity=1000, overlap=200)
+    split_text = splitter.chunks
+else:
+    splitter = RecursiveCharacterTextSplitter(
+        chunk_size=1000,
+        chunk_overlap=200
+    )
+    split_text = splitter.split_text
+
+def create_chunks(text: str):
+    """Create text chunks"""
+    return split_text(text)
+
+async def embed_chunks(chunks) -> list:
+    """Embed chunks in concurrent batches, keeping their order"""
+    semaphore = asyncio.Semaphore(EMBED_MAX_CONCURRENCY)
+    
+    async def embed_batch(batch):
+        async with semaphore:
+            return await embeddings.aembed_documents(batch)
+    
+    results = await asyncio.gather(*(
+        embed_batch(chunks[start:start + EMBED_BATCH_SIZE])
+        for start in range(0, len(chunks), EMBED_BATCH_SIZE)
+    ))
+    return [vector for batch_vectors in results for vector in batch_vectors]
+
+def build_index(vectors):
+    """Build a quantized HNSW index for small documents and IVF-PQ for large ones"""
+    matrix = np.asarray(vectors, dtype=np.float32)
+    count, dimension = matrix.shape
+    if count >= IVFPQ_MIN_VECTORS:
+        quantizer = faiss.IndexFlatL2(dimension)
+        index = faiss.IndexIVFPQ(quantizer, dimension, min(64, count // 39), 16, 8)
+        index.nprobe = 8
+    else:
+        index = faiss.IndexHNSWSQ(dimension, faiss.ScalarQuantizer.QT_8bit, 32)
+    # Both learn their codebooks or per-dimension ranges from the document
+    index.train(matrix)
+    index.add(matrix)
+    return index
+
+async def create_embeddings_store(chunks, session_id: str):
+    """Create FAISS store"""
+    vectors = await embed_chunks(chunks)
+    docstore = InMemoryDocstore({str(i): Document(page_content=chunk) for i, chunk in enumerate(chunks)})
+    index_to_docstore_id = {i: str(i) for i in range(len(chunks))}
+    store = FAISS(embeddings, build_index(vectors), docstore, index_to_docstore_id)
+    
+    # Save to session directory
+    os.makedirs("sessions", exist_ok=True)
+    store.save_local(f"sessions/{session_id}")
+    cache_vector_store(session_id, store)
+    
+    return store
+
+def cache_vector_store(session_id: str, store):
+    """Keep a FAISS store in memory, evicting the least recently used"""
+    with vector_store_lock:
+        vector_store_cache[session_id] = store
+        vector_store_cache.move_to_end(session_id)
+        while len(vector_store_cache) > VECTOR_STORE_CACHE_SIZE:
+            evicted, _ = vector_store_cache.popitem(last=False)
+            # The question cache is on disk too, so a cold session reloads it
+            question_caches.pop(evicted, None)
+            lock = question_cache_locks.get(evicted)
+            if lock is not None and not lock.locked():
+                question_cache_locks.pop(evicted, None)
+
+def load_vector_store(session_id: str):
+    """Return the cached FAISS store for a session, loading it on a miss"""
+    with vector_store_lock:
+        if session_id in vector_store_cache:
+            vector_store_cache.move_to_end(session_id)
+            return vector_store_cache[session_id]
+    
+    store = FAISS.load_local(
+        f"sessions/{session_id}", 
+        embeddings, 
+        allow_dangerous_deserialization=True
+    )
+    cache_vector_store(session_id, store)
+    return store
+
+def question_cache_path(session_id: str) -> str:
+    return f"sessions/{session_id}_qcache"
+
+def load_question_cache(session_id: str):
+    """Return the session's (index, answers), reading them from disk the first time"""
+    if session_id not in question_caches:
+        path = question_cache_path(session_id)
+        if os.path.exists(path):
+            index = faiss.read_index(os.path.join(path, "index.faiss"))
+            with open(os.path.join(path, "answers.json"), "rb") as f:
+                answers = orjson.loads(f.read())
+        else:
+            index, answers = None, []
+        question_caches[session_id] = (index, answers)
+    return question_caches[session_id]
+
+def lookup_question_cache(session_id: str, question_vector: np.ndarray):
+    index, answers = load_question_cache(session_id)
+    if index is None or index.ntotal == 0:
+        return None
+    scores, ids = index.search(question_vector, 1)
+    if scores[0][0] >= QUESTION_CACHE_THRESHOLD:
+        return answers[ids[0][0]]
+    return None
+
+def write_question_cache(path: str, index_bytes: bytes, answers_bytes: bytes):
+    os.makedirs(path, exist_ok=True)
+    for name, data in (("index.faiss", index_bytes), ("answers.json", answers_bytes)):
+        # Replace each file whole so a reader never sees a partial write
+        temp_path = os.path.join(path, f"{name}.tmp")
+        with open(temp_path, "wb") as f:
+            f.write(data)
+        os.replace(temp_path, os.path.join(path, name))
+
+async def store_question_cache(session_id: str, question_vector: np.ndarray, answer: Dict[str, Any]):
+    index, answers = load_question_cache(session_id)
+    if index is None:
+        index = faiss.IndexFlatIP(question_vector.shape[1])
+        question_caches[session_id] = (index, answers)
+    index.add(question_vector)
+    answers.append(answer)
+    if len(answers) > QUESTION_CACHE_SIZE:
+        # IndexFlatIP renumbers the remaining vectors, keeping ids aligned with answers
+        excess = len(answers) - QUESTION_CACHE_SIZE
+        index.remove_ids(np.arange(excess, dtype=np.int64))
+        del answers[:excess]
+    
+    # Snapshot in memory on the event loop, the only place the cache changes,
+    # then write it in a thread; the lock keeps writes in snapshot order
+    index_bytes = faiss.serialize_index(index).tobytes()
+    answers_bytes = orjson.dumps(answers)
+    lock = question_cache_locks.setdefault(session_id, asyncio.Lock())
+    async with lock:
+        await asyncio.to_thread(write_question_cache, question_cache_path(session_id), index_bytes, answers_bytes)
+
+async def get_answer(question: str, session_id: str):
+    """Get answer from stored documents"""
+    try:
+        # Cosine similarity as inner product over the normalized question embedding
+        question_vector = np.array([await embeddings.aembed_query(question)], dtype=np.float32)
+        faiss.normalize_L2(question_vector)
+        cached = lookup_question_cache(session_id, question_vector)
+        if cached is not None:
+            return {**cached, "session_id": session_id}
         
-        prompt = PromptTemplate(
-            template=prompt_template,
-            input_variables=["context", "question"]
-        )
-        
-        # Create chain
-        llm = ChatGoogleGenerativeAI(
-            model="gemini-1.5-flash",
-            google_api_key=GOOGLE_API_KEY,
-            temperature=0.1
-        )
+        # Load store; a cold load reads from disk, so keep it off the event loop
+        store = await asyncio.to_thread(load_vector_store, session_id)
         
-        chain = load_qa_chain(llm, prompt=prompt, chain_type="stuff")
+        # Get relevant docs, reusing the question embedding
+        docs = await store.asimilarity_search_by_vector(question_vector[0].tolist(), k=3)
         
         # Get response
-        response = chain.invoke({
-            "input_documents": docs,
-            "question": question
-        })
+        # The prompt is fixed, so format it directly instead of going through a QA chain
+        context = "\n\n".join(doc.page_content for doc in docs)
+        response = await llm.ainvoke(PROMPT_TEMPLATE.format(context=context, question=question))
         
         # Extract response text
-        response_text = ""
-        if 'output_text' in response:
-            response_text = response['output_text']
-        else:
-            response_text = response.get('text', 'No response generated')
+        response_text = response.content or 'No response generated'
         
         # Parse JSON response
         try:
-            json_response = json.loads(response_text)
-            return {
+            json_response = orjson.loads(response_text)
+            answer = {
                 "answer": json_response.get("answer", ""),
                 "reason": json_response.get("reason", ""),
-                "clause": json_response.get("clause", ""),
-                "session_id": session_id
+                "clause": json_response.get("clause", "")
             }
-        except json.JSONDecodeError:
-            return {
+        except orjson.JSONDecodeError:
+            answer = {
                 "answer": response_text,
                 "reason": "",
-                "clause": "",
-                "session_id": session_id
+                "clause": ""
             }
         
+        await store_question_cache(session_id, question_vector, answer)
+        return {**answer, "session_id": session_id}
+        
     except Exception as e:
         return {
             "answer": f"Error: {str(e)}",
@@ -194,6 +419,14 @@ Answer:"""
             "session_id": session_id
         }
 
+@app.on_event("startup")
+async def warm_up_llm():
+    app.state.llm_warm_up = start_llm_warm_up(llm)
+
+# PDFium is not thread-safe, so PDFs are extracted in a process pool
+app.add_event_handler("startup", start_pdf_pool)
+app.add_event_handler("shutdown", shutdown_pdf_pool)
+
 @app.get("/")
 async def root():
     return {"message": "Simple PDF Q&A API", "status": "running"}
@@ -213,12 +446,21 @@ async def upload_pdf(file: UploadFile = File(...)):
     try:
         # Save uploaded file
         with tempfile.NamedTemporaryFile(delete=False, suffix='.pdf') as temp_file:
-            content = await file.read()
-            temp_file.write(content)
             temp_path = temp_file.name
+            # Copy in 1 MiB chunks so the whole PDF is never held in memory
+            size = 0
+            while chunk := await file.read(UPLOAD_CHUNK_SIZE):
+                size += len(chunk)
+                if size > MAX_UPLOAD_BYTES:
+                    break
+                temp_file.write(chunk)
+        
+        if size > MAX_UPLOAD_BYTES:
+            os.unlink(temp_path)
+            raise HTTPException(status_code=413, detail="Upload too large")
         
         # Extract text
-        text = extract_text_from_pdf(temp_path)
+        text = await extract_text_from_pdf(temp_path)
         
         if not text.strip():
             raise HTTPException(status_code=400, detail="No text found in PDF")
@@ -227,7 +469,7 @@ async def upload_pdf(file: UploadFile = File(...)):
         chunks = create_chunks(text)
         
         # Create embeddings
-        create_embeddings_store(chunks, session_id)
+        await create_embeddings_store(chunks, session_id)
         
         # Store session
         sessions[session_id] = {"filename": file.filename}
@@ -240,6 +482,8 @@ async def upload_pdf(file: UploadFile = File(...)):
             message="PDF processed successfully"
         )
         
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -249,9 +493,23 @@ async def ask_question(request: QuestionRequest):
     if request.session_id not in sessions:
         raise HTTPException(status_code=404, detail="Session not found")
     
-    result = get_answer(request.question, request.session_id)
+    result = await get_answer(request.question, request.session_id)
     return AnswerResponse(**result)
 
+@app.post("/ask-questions", response_model=AnswersResponse)
+async def ask_questions(request: QuestionsRequest):
+    """Ask several questions about uploaded PDF in one request"""
+    if request.session_id not in sessions:
+        raise HTTPException(status_code=404, detail="Session not found")
+    
+    async def answer(question: str):
+        async with batch_semaphore:
+            return await get_answer(question, request.session_id)
+    
+    # Answered concurrently up to the limit; gather keeps them in question order
+    results = await asyncio.gather(*(answer(question) for question in request.questions))
+    return AnswersResponse(answers=[AnswerResponse(**result) for result in results])
+
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run(app, host="0.0.0.0", port=8000)
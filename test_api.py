@@ -1,80 +1,380 @@
-import requests
-import json
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+from pathlib import Path
+import argparse
+import asyncio
+import atexit
+import contextlib
+import gzip
+import hashlib
+import importlib.util
+import logging
+import mmap
 import os
+import random
+import statistics
+import time
+from typing import Final
+
+import httpx
+import orjson
+
+# Progress goes through logging so --quiet can leave only the benchmark results
+log = logging.getLogger("test_api")
 
 # API Base URL (change this to your Railway URL after deployment)
 BASE_URL = "http://localhost:8000"
 
-def test_api():
-    print("🧪 Testing PDF Q&A API")
-    print("=" * 50)
-    
-    # Test health check
-    print("1. Testing health check...")
+# Sent with every request. Content-Type is left per request: httpx only fills
+# it in when missing, so a client-wide value would break multipart uploads
+DEFAULT_HEADERS = {"Accept": "application/json", "User-Agent": "pdf-qa-test/1.0"}
+
+# HTTP/2 needs the h2 package (pip install -r requirements-dev.txt) and an
+# https deployment: httpx does not speak cleartext h2c, so against a local
+# uvicorn every request uses HTTP/1.1 either way
+HTTP2 = importlib.util.find_spec("h2") is not None
+
+# One shared client so every call reuses pooled connections; the transport
+# also retries failed connection attempts
+CLIENT = httpx.Client(
+    base_url=BASE_URL,
+    headers=DEFAULT_HEADERS,
+    transport=httpx.HTTPTransport(
+        http2=HTTP2,
+        limits=httpx.Limits(max_keepalive_connections=20, max_connections=100),
+        retries=3
+    ),
+    timeout=httpx.Timeout(5.0, read=60.0)
+)
+atexit.register(CLIENT.close)
+
+# Request bodies are encoded with orjson, so the content type is set explicitly
+JSON_HEADERS = {"Content-Type": "application/json"}
+
+# Answers are cached on disk so re-asking a question skips the LLM round trip.
+# Every run uploads again and gets a new session, so entries are keyed by the
+# PDF's contents rather than its session id
+CACHE_DIR = Path(".test_api_cache")
+CACHE_TTL_SECONDS = 24 * 60 * 60
+USE_CACHE = True
+
+def pdf_digest(pdf_path):
+    with pdf_path.open('rb') as f:
+        return hashlib.file_digest(f, "sha1").hexdigest()
+
+def cache_path(document_key, question):
+    normalized = " ".join(question.lower().split())
+    key = hashlib.sha1(f"{document_key}|{normalized}".encode()).hexdigest()
+    return CACHE_DIR / f"{key}.json"
+
+def load_cached_answer(document_key, question):
+    if not USE_CACHE:
+        return None
+    path = cache_path(document_key, question)
     try:
-        response = requests.get(f"{BASE_URL}/health")
-        print(f"✅ Health check: {response.json()}")
-    except Exception as e:
-        print(f"❌ Health check failed: {e}")
+        if time.time() - path.stat().st_mtime < CACHE_TTL_SECONDS:
+            return orjson.loads(path.read_bytes())
+    except (OSError, ValueError):
+        pass
+    return None
+
+def save_cached_answer(document_key, question, answer):
+    if not USE_CACHE:
         return
+    CACHE_DIR.mkdir(exist_ok=True)
+    path = cache_path(document_key, question)
+    # Write to a temporary file first so a partial write is never read back
+    temp_path = path.with_suffix(".tmp")
+    temp_path.write_bytes(orjson.dumps(answer))
+    os.replace(temp_path, path)
+
+RETRY_STATUSES = {429, 502, 503, 504}
+# Larger files are rejected before any upload is attempted
+MAX_PDF_BYTES = 100 * 1024 * 1024
+# With --gzip-upload, upload bodies above this size are sent gzip-compressed
+GZIP_MIN_BYTES = 64 * 1024
+GZIP_UPLOAD = False
+
+# With --cassette, HTTP exchanges are recorded once and replayed on later runs;
+# set VCR_RECORD_MODE=none in CI so an unrecorded request fails instead
+DEFAULT_CASSETTE = "cassettes/test_api.yaml"
+
+def _body_digest(request):
+    body = request.body or b""
+    if isinstance(body, str):
+        body = body.encode()
+    # Multipart boundaries are random per request, so leave them out of the hash
+    content_type = request.headers.get("Content-Type", "")
+    if "boundary=" in content_type:
+        body = body.replace(content_type.split("boundary=", 1)[1].encode(), b"")
+    return hashlib.sha1(body).hexdigest()
+
+def _match_body_digest(r1, r2):
+    assert _body_digest(r1) == _body_digest(r2)
+
+def use_cassette(path):
+    """Record or replay every request made inside the block (pip install vcrpy)"""
+    import vcr
+    
+    recorder = vcr.VCR(record_mode=os.environ.get("VCR_RECORD_MODE", "new_episodes"))
+    recorder.register_matcher("body_digest", _match_body_digest)
+    return recorder.use_cassette(
+        path, match_on=("method", "scheme", "host", "port", "path", "query", "body_digest")
+    )
+
+def _request_with_retry(method, url, *, retries=4, backoff=0.5, **kw):
+    """Send a request, retrying transient failures with jittered exponential backoff"""
+    for attempt in range(retries):
+        try:
+            response = CLIENT.request(method, url, **kw)
+            if response.status_code not in RETRY_STATUSES or attempt == retries - 1:
+                return response
+        except httpx.TransportError:
+            if attempt == retries - 1:
+                raise
+        time.sleep(backoff * 2 ** attempt + random.uniform(0, 0.25))
+
+@lru_cache(maxsize=8)
+def _cached_get(url, bucket):
+    return orjson.loads(_request_with_retry("GET", url, timeout=5).content)
+
+def health(base=None, ttl=30):
+    """Health probe result, memoized for ttl seconds per base URL"""
+    # The bucket changes every ttl seconds, so older entries simply stop matching
+    return _cached_get(f"{base or BASE_URL}/health", int(time.time() // ttl))
+
+def build_upload(pdf_path, compress):
+    """Encode the multipart upload body once so repeated uploads resend the same
+    bytes. Returns (body, headers)"""
+    with pdf_path.open('rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as pdf:
+        # A boundary derived from the file keeps the body identical across runs,
+        # so a compressed upload (where it cannot be stripped) replays from a cassette
+        boundary = hashlib.sha1(pdf).hexdigest()
+        # httpx reads the mapped file straight into the encoded body
+        request = CLIENT.build_request(
+            "POST", "/upload-pdf",
+            files={'file': (pdf_path.name, pdf, 'application/pdf')},
+            headers={"Content-Type": f"multipart/form-data; boundary={boundary}"}
+        )
+        body = request.read()
+    headers = {"Content-Type": request.headers["Content-Type"]}
+    if compress:
+        body = gzip.compress(body, compresslevel=6, mtime=0)
+        headers["Content-Encoding"] = "gzip"
+    return body, headers
+
+def print_answer(answer):
+    log.info("💬 Answer: %s", answer['answer'])
+    log.info("📝 Reason: %s", answer['reason'])
+    log.info("📄 Clause: %s", answer['clause'])
+
+async def ask_questions_concurrently(session_id, questions):
+    """Send all questions at once so N questions take about one round trip"""
+    limits = httpx.Limits(max_connections=100, max_keepalive_connections=20)
+    async with httpx.AsyncClient(
+        base_url=BASE_URL, headers=DEFAULT_HEADERS, limits=limits, http2=HTTP2, timeout=30.0
+    ) as client:
+        return await asyncio.gather(*(
+            client.post(
+                "/ask-question",
+                content=orjson.dumps({"question": question, "session_id": session_id}),
+                headers=JSON_HEADERS
+            )
+            for question in questions
+        ))
+
+def ask_batch(session_id, questions):
+    """Ask all questions in one /ask-questions request, falling back to concurrent
+    /ask-question calls on servers without the batch endpoint.
+    Returns one answer dict or error message per question, in question order."""
+    response = _request_with_retry(
+        "POST", "/ask-questions",
+        content=orjson.dumps({"questions": questions, "session_id": session_id}),
+        headers=JSON_HEADERS
+    )
+    if response.status_code == 200:
+        return orjson.loads(response.content)["answers"]
+    if response.status_code not in (404, 405):
+        return [response.text] * len(questions)
     
-    # Test PDF upload (you need to have a PDF file)
-    pdf_file_path = input("Enter path to a PDF file to test (or press Enter to skip): ").strip()
+    responses = asyncio.run(ask_questions_concurrently(session_id, questions))
+    return [
+        orjson.loads(response.content) if response.status_code == 200 else response.text
+        for response in responses
+    ]
+
+async def drive(session_id, questions, concurrency, iterations):
+    """Send iterations requests, cycling through questions, with at most concurrency
+    in flight. Returns (warm-up seconds, run seconds, [(latency, succeeded), ...])"""
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    async with httpx.AsyncClient(
+        base_url=BASE_URL, headers=DEFAULT_HEADERS, limits=limits, http2=HTTP2, timeout=60.0
+    ) as client:
+        semaphore = asyncio.Semaphore(concurrency)
+        
+        async def ask(question):
+            async with semaphore:
+                start = time.perf_counter()
+                try:
+                    response = await client.post(
+                        "/ask-question",
+                        content=orjson.dumps({"question": question, "session_id": session_id}),
+                        headers=JSON_HEADERS
+                    )
+                    ok = response.status_code == 200
+                except httpx.TransportError:
+                    ok = False
+                return time.perf_counter() - start, ok
+        
+        # Establish the connections before timing, so the measured numbers
+        # reflect steady state rather than connection setup
+        start = time.perf_counter()
+        await asyncio.gather(*(client.get("/health", timeout=5) for _ in range(max(concurrency, 2))))
+        warmup_seconds = time.perf_counter() - start
+        
+        start = time.perf_counter()
+        results = await asyncio.gather(*(
+            ask(questions[i % len(questions)]) for i in range(iterations)
+        ))
+        return warmup_seconds, time.perf_counter() - start, results
+
+def benchmark(session_id, questions, concurrency, iterations):
+    """Ask questions from one event loop and report throughput and latency"""
+    log.info("\n4. Benchmarking %s requests at concurrency %s...", iterations, concurrency)
+    warmup_seconds, elapsed, results = asyncio.run(drive(session_id, questions, concurrency, iterations))
+    log.info("🔥 Warm-up (cold connections): %.0f ms", warmup_seconds * 1000)
+    
+    latencies = sorted(latency for latency, _ in results)
+    succeeded = sum(ok for _, ok in results)
+    p95 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))]
+    # The results are the point of a benchmark run, so they print even with --quiet
+    print(f"📊 Warm: {succeeded}/{iterations} succeeded in {elapsed:.2f}s ({iterations / elapsed:.1f} req/s)")
+    print(f"⏱️ p50 {statistics.median(latencies) * 1000:.0f} ms, p95 {p95 * 1000:.0f} ms")
+
+def test_api(pdf_file_path=None, questions=None, questions_file=None, concurrency=1, iterations=1, uploads=1):
+    log.info("🧪 Testing PDF Q&A API")
+    log.info("=" * 50)
     
-    if not pdf_file_path or not os.path.exists(pdf_file_path):
-        print("⚠️ No valid PDF file provided. Skipping upload test.")
+    # Test health check while the user is typing the PDF path
+    log.info("1. Testing health check...")
+    with ThreadPoolExecutor(max_workers=1) as executor:
+        health_check = executor.submit(health)
+        
+        # Test PDF upload (you need to have a PDF file)
+        if pdf_file_path is None:
+            pdf_file_path = input("Enter path to a PDF file to test (or press Enter to skip): ").strip()
+        
+        try:
+            log.info("✅ Health check: %s", health_check.result())
+        except Exception as e:
+            log.error("❌ Health check failed: %s", e)
+            return
+    
+    # One stat call covers both "missing" and "is a directory"
+    pdf_path = Path(pdf_file_path) if pdf_file_path else None
+    if pdf_path is None or not pdf_path.is_file():
+        log.warning("⚠️ No valid PDF file provided. Skipping upload test.")
+        return
+    pdf_size = pdf_path.stat().st_size
+    if not 0 < pdf_size <= MAX_PDF_BYTES:
+        log.warning("⚠️ PDF is %s bytes; expected 1 to %s. Skipping upload test.", pdf_size, MAX_PDF_BYTES)
         return
     
-    print(f"\n2. Uploading PDF: {pdf_file_path}")
+    log.info("\n2. Uploading PDF: %s", pdf_file_path)
     try:
-        with open(pdf_file_path, 'rb') as f:
-            files = {'file': f}
-            response = requests.post(f"{BASE_URL}/upload-pdf", files=files)
+        # Processing a large PDF can take a while, so allow a longer read
+        upload_timeout = httpx.Timeout(5.0, read=300.0)
+        compress = GZIP_UPLOAD and pdf_size > GZIP_MIN_BYTES
+        if compress or uploads > 1:
+            body, headers = build_upload(pdf_path, compress)
+            start = time.perf_counter()
+            for _ in range(uploads):
+                response = _request_with_retry(
+                    "POST", "/upload-pdf", content=body, headers=headers, timeout=upload_timeout
+                )
+            if uploads > 1:
+                elapsed = time.perf_counter() - start
+                print(f"📊 Uploads: {uploads} in {elapsed:.2f}s ({elapsed / uploads * 1000:.0f} ms each)")
+        else:
+            with pdf_path.open('rb') as f:
+                # httpx streams the file from disk and rewinds it for each retry
+                response = _request_with_retry(
+                    "POST", "/upload-pdf",
+                    files={'file': (pdf_path.name, f, 'application/pdf')},
+                    timeout=upload_timeout
+                )
         
         if response.status_code == 200:
-            upload_result = response.json()
+            upload_result = orjson.loads(response.content)
             session_id = upload_result['session_id']
-            print(f"✅ Upload successful!")
-            print(f"📋 Session ID: {session_id}")
+            log.info("✅ Upload successful!")
+            log.info("📋 Session ID: %s", session_id)
+            log.info("🔗 Protocol: %s", response.http_version)
             
             # Test asking a question
-            print(f"\n3. Testing question answering...")
-            question = input("Enter a question about the PDF: ").strip()
+            log.info("\n3. Testing question answering...")
+            if not questions and questions_file:
+                with open(questions_file, encoding="utf-8") as f:
+                    questions = [line.strip() for line in f if line.strip()]
+            elif not questions:
+                print("Enter questions about the PDF, one per line (empty line to finish):")
+                questions = []
+                while question := input("> ").strip():
+                    questions.append(question)
             
-            if question:
-                question_data = {
-                    "question": question,
-                    "session_id": session_id
-                }
-                
-                response = requests.post(
-                    f"{BASE_URL}/ask-question",
-                    json=question_data
-                )
+            if questions:
+                document_key = pdf_digest(pdf_path) if USE_CACHE else None
+                answers = {}
+                for question in questions:
+                    cached = load_cached_answer(document_key, question)
+                    if cached is not None:
+                        answers[question] = cached
+                pending = [question for question in questions if question not in answers]
                 
-                if response.status_code == 200:
-                    answer = response.json()
-                    print(f"✅ Question answered!")
-                    print(f"💬 Answer: {answer['answer']}")
-                    print(f"📝 Reason: {answer['reason']}")
-                    print(f"📄 Clause: {answer['clause']}")
+                if len(pending) == 1:
+                    question_data = {
+                        "question": pending[0],
+                        "session_id": session_id
+                    }
+                    response = _request_with_retry(
+                        "POST", "/ask-question",
+                        content=orjson.dumps(question_data),
+                        headers=JSON_HEADERS
+                    )
+                    results = [orjson.loads(response.content) if response.status_code == 200 else response.text]
+                elif pending:
+                    results = ask_batch(session_id, pending)
                 else:
-                    print(f"❌ Question failed: {response.text}")
+                    results = []
+                
+                failures = {}
+                for question, result in zip(pending, results):
+                    if isinstance(result, dict):
+                        answers[question] = result
+                        save_cached_answer(document_key, question, result)
+                    else:
+                        failures[question] = result
+                
+                for question in questions:
+                    log.info("\n❓ %s", question)
+                    if question in answers:
+                        log.info("✅ Question answered!")
+                        print_answer(answers[question])
+                    else:
+                        log.error("❌ Question failed: %s", failures[question])
+                
+                if concurrency > 1 or iterations > 1:
+                    benchmark(session_id, questions, concurrency, iterations)
             else:
-                print("⚠️ No question provided.")
+                log.warning("⚠️ No question provided.")
                 
         else:
-            print(f"❌ Upload failed: {response.text}")
+            log.error("❌ Upload failed: %s", response.text)
             
     except Exception as e:
-        print(f"❌ Error during upload: {e}")
+        log.error("❌ Error during upload: %s", e)
 
-def demo_javascript_code():
-    print("\n" + "=" * 50)
-    print("📱 JavaScript Example for Web Developers:")
-    print("=" * 50)
-    
-    js_code = """
+_JS_EXAMPLE: Final[str] = """
 // Example usage in JavaScript/Web application
 async function uploadPDFAndAsk(pdfFile, question) {
     const API_URL = 'https://your-app-name.up.railway.app';
@@ -112,15 +412,45 @@ async function uploadPDFAndAsk(pdfFile, question) {
 // Usage:
 // const pdfFile = document.getElementById('pdfInput').files[0];
 // uploadPDFAndAsk(pdfFile, 'Is knee surgery covered?');
-    """
-    print(js_code)
+"""
+
+def demo_javascript_code():
+    log.info("\n" + "=" * 50)
+    log.info("📱 JavaScript Example for Web Developers:")
+    log.info("=" * 50)
+    
+    log.info(_JS_EXAMPLE)
 
 if __name__ == "__main__":
-    test_api()
-    demo_javascript_code()
+    parser = argparse.ArgumentParser(description="Test the PDF Q&A API")
+    parser.add_argument("--base-url", default=BASE_URL, help="API base URL")
+    parser.add_argument("--pdf", help="PDF to upload (prompted for if omitted)")
+    parser.add_argument("--question", action="append", help="question to ask; may be repeated")
+    parser.add_argument("--questions-file", help="file with one question per line, asked as a batch")
+    parser.add_argument("--concurrency", type=int, default=1, help="parallel requests when benchmarking")
+    parser.add_argument("--iterations", type=int, default=1, help="requests to send when benchmarking")
+    parser.add_argument("--uploads", type=int, default=1, help="times to upload the PDF when benchmarking uploads")
+    parser.add_argument("--show-js", action="store_true", help="print a JavaScript usage example")
+    parser.add_argument("--gzip-upload", action="store_true", help="gzip-compress the PDF upload (simple_api only)")
+    parser.add_argument("--no-cache", action="store_true", help="always ask the API, ignoring cached answers")
+    parser.add_argument("--cassette", nargs="?", const=DEFAULT_CASSETTE, help=f"record/replay HTTP traffic (default {DEFAULT_CASSETTE})")
+    parser.add_argument("--quiet", action="store_true", help="only report warnings, errors and benchmark results")
+    args = parser.parse_args()
+    BASE_URL = args.base_url.rstrip("/")
+    CLIENT.base_url = BASE_URL
+    USE_CACHE = not args.no_cache
+    GZIP_UPLOAD = args.gzip_upload
+    # The root handler stays at WARNING so httpx and vcrpy request logs stay out
+    logging.basicConfig(level=logging.WARNING, format="%(message)s")
+    log.setLevel(logging.WARNING if args.quiet else logging.INFO)
+    
+    with use_cassette(args.cassette) if args.cassette else contextlib.nullcontext():
+        test_api(args.pdf, args.question, args.questions_file, args.concurrency, args.iterations, args.uploads)
+    if args.show_js:
+        demo_javascript_code()
     
-    print("\n" + "=" * 50)
-    print("🎉 API Testing Complete!")
-    print("📖 Check API_DOCUMENTATION.md for full documentation")
-    print("🚀 Check DEPLOYMENT_GUIDE.md for hosting instructions")
-    print("=" * 50)
+    log.info("\n" + "=" * 50)
+    log.info("🎉 API Testing Complete!")
+    log.info("📖 Check API_DOCUMENTATION.md for full documentation")
+    log.info("🚀 Check DEPLOYMENT_GUIDE.md for hosting instructions")
+    log.info("=" * 50)